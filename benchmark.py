@@ -0,0 +1,591 @@
+"""
+Offline benchmark harness for the course build pipeline.
+
+Everything that normally needs the network is replaced with a local stand-in:
+
+- a FastAPI app serving fake ``/v2/answer`` and ``/v1/statistics`` endpoints
+  in place of the Pathway RAG server,
+- a fake ``genai`` client whose ``generate_content`` returns slides, a
+  configurable share of them malformed to exercise the repair layer,
+- a fake ``embed_content`` so the semantic answer cache is exercised,
+- a fake ``agentic_doc.parse`` for the LandingAI document parser.
+
+Each stand-in has a configurable latency, error rate and payload size. The
+harness drives ``recreate_course`` over synthetic courses of several sizes,
+the LandingAI parser UDF and the ``file_server`` endpoints, and writes wall
+time, throughput, p50/p99 latencies and peak memory as JSON.
+
+The ``index`` benchmark measures how a cosine USearch index, as used by the
+retriever, scales with the number of chunks: build time, ingest batch
+latency, memory and query p99, with a fixed and an auto-sized reserved space.
+
+Usage:
+    python benchmark.py e2e --sizes 2x3,5x8 --iterations 3 --output bench.json
+    python benchmark.py index --sizes 10000,100000 --output index.json
+    python benchmark.py index --sizes 1000000 --dtype i8 --output index_1m.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import resource
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+import tracemalloc
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List
+
+# pathway_server creates a genai client at import time, give it a dummy key.
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+
+# ---------- stand-ins ----------
+class FakeBackendError(RuntimeError):
+    pass
+
+
+class Stub:
+    """Latency, error rate and payload size shared by every stand-in."""
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, payload_size: int = 1000, seed: int = 0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.payload_size = payload_size
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def hit(self) -> bool:
+        """Sleep for the configured latency and return True if this call should fail."""
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+            failed = self.rng.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        return failed
+
+    def text(self, size: int = None) -> str:
+        size = self.payload_size if size is None else size
+        words = []
+        total = 0
+        while total < size:
+            word = self.rng.choice(LOREM)
+            words.append(word)
+            total += len(word) + 1
+        return " ".join(words)[:size]
+
+
+LOREM = (
+    "payment settlement clearing regulator compliance ledger transfer account "
+    "merchant acquirer issuer card network interchange dispute refund audit "
+    "reporting threshold limit customer identity verification"
+).split()
+
+
+def fake_rag_app(stub: Stub, stats: Dict[str, Any]) -> FastAPI:
+    rag = FastAPI()
+
+    @rag.post("/v2/answer")
+    def answer(body: dict):
+        if stub.hit():
+            return JSONResponse(status_code=500, content={"detail": "injected failure"})
+        docs = [
+            {"text": stub.text(stub.payload_size // 4), "metadata": {"path": f"data/docs/doc_{i}.pdf"}, "dist": 0.1 * i}
+            for i in range(4)
+        ]
+        return {"response": stub.text(), "context_docs": docs}
+
+    @rag.post("/v1/statistics")
+    def statistics():
+        if stub.hit():
+            return JSONResponse(status_code=500, content={"detail": "injected failure"})
+        return stats
+
+    return rag
+
+
+class FakeRAGServer:
+    """Runs the fake RAG app with uvicorn on a free local port."""
+
+    def __init__(self, stub: Stub):
+        self.stub = stub
+        self.stats = {"file_count": 0, "last_modified": 0, "last_indexed": 0}
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            self.port = s.getsockname()[1]
+        self.url = f"http://127.0.0.1:{self.port}"
+        config = uvicorn.Config(fake_rag_app(stub, self.stats), host="127.0.0.1", port=self.port, log_level="warning")
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self._server.should_exit = True
+        self._thread.join()
+
+
+class FakeGenAIClient:
+    """Mimics ``genai.Client`` closely enough for ``get_output_from_llm``."""
+
+    def __init__(self, stub: Stub, malformed_rate: float = 0.0):
+        self.stub = stub
+        self.malformed_rate = malformed_rate
+        self.malformed = 0
+        self.models = self
+
+    def generate_content(self, model: str, contents: str, config: Any = None):
+        if self.stub.hit():
+            raise FakeBackendError("injected generate_content failure")
+        slide = self.slide()
+        if self.stub.rng.random() < self.malformed_rate:
+            self.malformed += 1
+            return SimpleNamespace(text=self.malform(slide))
+        return SimpleNamespace(text=json.dumps(slide))
+
+    def embed_content(self, model: str, contents: str, config: Any = None):
+        """Hashed bag-of-words embedding, so reworded queries land close together."""
+        vector = [0.0] * 64
+        for word in contents.lower().split():
+            vector[zlib.crc32(word.encode()) % 64] += 1.0
+        return SimpleNamespace(embeddings=[SimpleNamespace(values=vector)])
+
+    def slide(self) -> Dict[str, Any]:
+        rng = self.stub.rng
+        n_rows = max(1, self.stub.payload_size // 200)
+        rows = [self.stub.text(12) for _ in range(n_rows)]
+        return {
+            "id": f"slide-{rng.randrange(10 ** 6)}",
+            "slide": {
+                "text_list": [self.stub.text(40), self.stub.text(self.stub.payload_size // 4)],
+                "image_list": [],
+                "figures": [{
+                    "type": "table",
+                    "data": {
+                        "rows": rows,
+                        "columns": ["Feature", "Value"],
+                        "values": [[row, self.stub.text(20)] for row in rows],
+                    },
+                }],
+            },
+        }
+
+    def malform(self, slide: Dict[str, Any]) -> str:
+        """Breaks the slide in one of the ways real model output does."""
+        kind = self.stub.rng.randrange(3)
+        if kind == 0:
+            # flat slide as in the prompt template, with an extra key and integer cells
+            flat = {"id": slide["id"], "type": 3, **slide["slide"]}
+            data = flat["figures"][0]["data"]
+            data["values"] = [self.stub.rng.randrange(100) for _ in data["rows"]]
+            return json.dumps(flat)
+        if kind == 1:
+            # ragged rows
+            for row in slide["slide"]["figures"][0]["data"]["values"]:
+                row.append("extra")
+            return json.dumps(slide)
+        # truncated output
+        text = json.dumps(slide)
+        return text[:int(len(text) * 0.8)]
+
+
+def make_fake_parse(stub: Stub) -> Callable:
+    """Returns a stand-in for ``agentic_doc.parse.parse``."""
+
+    def fake_parse(contents, **kwargs):
+        if stub.hit():
+            raise FakeBackendError("injected parse failure")
+        return [SimpleNamespace(
+            markdown=stub.text(),
+            confidence=0.9,
+            extraction_metadata={
+                "document_text": {"value": [stub.text(80) for _ in range(4)]},
+                "document_table": {"value": []},
+            },
+        )]
+
+    return fake_parse
+
+
+# ---------- measurement ----------
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarise(name: str, latencies: List[float], errors: int, wall: float, peak: int, **extra) -> Dict[str, Any]:
+    ops = len(latencies)
+    return {
+        "name": name,
+        **extra,
+        "ops": ops,
+        "errors": errors,
+        "wall_time_s": round(wall, 6),
+        "throughput_per_s": round(ops / wall, 3) if wall else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 3),
+            "p99": round(percentile(latencies, 99) * 1000, 3),
+            "mean": round(sum(latencies) / ops * 1000, 3) if ops else 0.0,
+            "max": round(max(latencies) * 1000, 3) if ops else 0.0,
+        },
+        "peak_memory_bytes": peak,
+    }
+
+
+class Timed:
+    """Wraps a module attribute and records the latency of every call."""
+
+    def __init__(self, module, attr: str):
+        self.module = module
+        self.attr = attr
+        self.original = getattr(module, attr)
+        self.latencies: List[float] = []
+        self.errors = 0
+
+    def __enter__(self):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return self.original(*args, **kwargs)
+            except Exception:
+                self.errors += 1
+                raise
+            finally:
+                self.latencies.append(time.perf_counter() - start)
+
+        setattr(self.module, self.attr, wrapper)
+        return self
+
+    def __exit__(self, *exc):
+        setattr(self.module, self.attr, self.original)
+
+
+def measure(fn: Callable[[], Any], iterations: int):
+    """Runs ``fn`` repeatedly, returning latencies, error count, wall time and peak traced memory."""
+    latencies, errors = [], 0
+    tracemalloc.start()
+    wall_start = time.perf_counter()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        try:
+            fn()
+        except Exception:
+            errors += 1
+        latencies.append(time.perf_counter() - start)
+    wall = time.perf_counter() - wall_start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return latencies, errors, wall, peak
+
+
+# ---------- synthetic inputs ----------
+def synthetic_course(modules: int, slides: int, rng: random.Random) -> Dict[str, Any]:
+    return {
+        "course_name": f"Synthetic course {modules}x{slides}",
+        "modules": [
+            {
+                "name": f"Module {m + 1}: " + " ".join(rng.choices(LOREM, k=4)),
+                "slides": [{"desc": "Explain " + " ".join(rng.choices(LOREM, k=8))} for _ in range(slides)],
+            }
+            for m in range(modules)
+        ],
+    }
+
+
+def parse_sizes(spec: str) -> List[tuple]:
+    sizes = []
+    for item in spec.split(","):
+        modules, slides = item.lower().split("x")
+        sizes.append((int(modules), int(slides)))
+    return sizes
+
+
+# ---------- scenarios ----------
+def bench_courses(ps, args, workdir: Path) -> List[Dict[str, Any]]:
+    results = []
+    rng = random.Random(args.seed)
+    for modules, slides in parse_sizes(args.sizes):
+        course_file = workdir / f"course_{modules}x{slides}.json"
+        course_file.write_text(json.dumps(synthetic_course(modules, slides, rng)), encoding="utf-8")
+        ps.COURSE_FILE = course_file
+        size = {"modules": modules, "slides_per_module": slides, "slides": modules * slides}
+
+        with Timed(ps, "run_info_query") as rag, Timed(ps, "get_output_from_llm") as llm, \
+                ThreadPoolExecutor(args.module_workers) as executor:
+            build = partial(ps.recreate_course, executor=executor if args.module_workers > 1 else None)
+            latencies, errors, wall, peak = measure(build, args.iterations)
+
+        results.append(summarise("recreate_course", latencies, errors, wall, peak, **size))
+        results.append(summarise("rag_answer", rag.latencies, rag.errors, wall, peak, **size))
+        results.append(summarise("generate_content", llm.latencies, llm.errors, wall, peak, **size))
+    return results
+
+
+def bench_status_poll(ps, args, server: FakeRAGServer) -> Dict[str, Any]:
+    import requests
+
+    def poll():
+        response = requests.post(f"{server.url}/v1/statistics", timeout=5)
+        response.raise_for_status()
+        ps.StatusCheckResult(**response.json())
+
+    latencies, errors, wall, peak = measure(poll, args.iterations * 10)
+    return summarise("statistics_poll", latencies, errors, wall, peak)
+
+
+def bench_parser(ps, args) -> Dict[str, Any]:
+    parser = ps.LandingAICustomDocumentParser(
+        api_key="benchmark", capacity=1, results_dir=str(Path(tempfile.mkdtemp()) / "processed")
+    )
+    contents = os.urandom(args.payload_size)
+    latencies, errors, wall, peak = measure(lambda: asyncio.run(parser.parse(contents)), args.iterations * 10)
+    return summarise("landingai_parse", latencies, errors, wall, peak)
+
+
+def bench_file_server(args, workdir: Path) -> List[Dict[str, Any]]:
+    os.environ["ROOT_DIR"] = str(workdir / "docs")
+    import file_server
+    from fastapi.testclient import TestClient
+
+    file_server.COURSE_FILE = workdir / "input" / "course_structure.json"
+    file_server.COURSE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    http = TestClient(file_server.app)
+    rng = random.Random(args.seed)
+    course = synthetic_course(5, 8, rng)
+    blob = os.urandom(args.payload_size)
+    n = args.iterations * 10
+    counter = iter(range(10 ** 9))
+
+    def check(response):
+        if response.status_code >= 400:
+            raise FakeBackendError(response.text)
+
+    def upload():
+        i = next(counter)
+        check(http.post("/api/upload", data={"dir": ""}, files={"file": (f"doc_{i}.pdf", blob)}))
+
+    scenarios = {
+        "file_server_save_course": lambda: check(http.post("/api/course", json=course)),
+        "file_server_get_course": lambda: check(http.get("/api/course")),
+        "file_server_upload": upload,
+        "file_server_tree": lambda: check(http.get("/api/tree")),
+    }
+    results = []
+    for name, fn in scenarios.items():
+        latencies, errors, wall, peak = measure(fn, n)
+        results.append(summarise(name, latencies, errors, wall, peak))
+    return results
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=Path(__file__).parent, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return ""
+
+
+def run_metadata(args) -> Dict[str, Any]:
+    return {
+        "benchmark": args.command,
+        "timestamp": time.time(),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("func", "output")},
+    }
+
+
+def run_e2e(args) -> Dict[str, Any]:
+    import pathway_server as ps
+
+    rag_stub = Stub(args.rag_latency, args.error_rate, args.payload_size, args.seed)
+    llm_stub = Stub(args.llm_latency, args.error_rate, args.payload_size, args.seed + 1)
+    parse_stub = Stub(args.parse_latency, args.error_rate, args.payload_size, args.seed + 2)
+    ps.client = FakeGenAIClient(llm_stub, args.malformed_rate)
+    ps.parse = make_fake_parse(parse_stub)
+
+    workdir = Path(tempfile.mkdtemp(prefix="deltalearn-bench-"))
+    ps.answer_cache = ps.SemanticAnswerCache(workdir / "answers.sqlite3")
+    scenarios = []
+    with FakeRAGServer(rag_stub) as server:
+        ps.PATHWAY_URL = server.url
+        scenarios += bench_courses(ps, args, workdir)
+        scenarios.append(bench_status_poll(ps, args, server))
+    scenarios.append(bench_parser(ps, args))
+    scenarios += bench_file_server(args, workdir)
+
+    return {
+        **run_metadata(args),
+        "stand_ins": {
+            "rag": {"calls": rag_stub.calls, "errors": rag_stub.errors},
+            "generate_content": {"calls": llm_stub.calls, "errors": llm_stub.errors, "malformed": ps.client.malformed},
+            "parse": {"calls": parse_stub.calls, "errors": parse_stub.errors},
+        },
+        "answer_cache": {"hits": ps.answer_cache.hits, "misses": ps.answer_cache.misses},
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "scenarios": scenarios,
+    }
+
+
+# ---------- KNN index scaling ----------
+def current_rss() -> int:
+    """Resident set size in bytes, falling back to the peak when /proc is unavailable."""
+    try:
+        pages = int(Path("/proc/self/statm").read_text().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# Bytes per stored vector component, for the vector_bytes estimate.
+DTYPE_BYTES = {"f32": 4, "f16": 2, "i8": 1}
+
+
+def reserve(index, capacity: int) -> bool:
+    """Reserves space up front where this usearch release allows it; recent ones grow on add only."""
+    for target in (index, getattr(index, "_compiled", None)):
+        if hasattr(target, "reserve"):
+            target.reserve(capacity)
+            return True
+    return False
+
+
+def bench_index(size: int, policy: str, reserved: int, args, np, Index) -> Dict[str, Any]:
+    rng = np.random.default_rng(args.seed)
+
+    def vectors(n):
+        v = rng.standard_normal((n, args.dim), dtype=np.float32)
+        return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+    rss_before = current_rss()
+    index = Index(ndim=args.dim, metric="cos", dtype=args.dtype)
+    reserved_up_front = reserve(index, reserved)
+
+    batch_latencies = []
+    start = time.perf_counter()
+    for offset in range(0, size, args.batch):
+        n = min(args.batch, size - offset)
+        batch = vectors(n)
+        t = time.perf_counter()
+        index.add(np.arange(offset, offset + n), batch)
+        batch_latencies.append(time.perf_counter() - t)
+    build = time.perf_counter() - start
+    rss_after = current_rss()
+
+    query_latencies = []
+    for query in vectors(args.queries):
+        t = time.perf_counter()
+        index.search(query, args.k)
+        query_latencies.append(time.perf_counter() - t)
+
+    result = {
+        "name": "knn_index",
+        "chunks": size,
+        "policy": policy,
+        "reserved_space": reserved,
+        "reserved_up_front": reserved_up_front,
+        "dtype": args.dtype,
+        "vector_bytes": size * args.dim * DTYPE_BYTES[args.dtype],
+        "build_time_s": round(build, 6),
+        "ingest_per_s": round(size / build, 3) if build else 0.0,
+        "batch_add_ms": {
+            "p50": round(percentile(batch_latencies, 50) * 1000, 3),
+            "p99": round(percentile(batch_latencies, 99) * 1000, 3),
+            "max": round(max(batch_latencies) * 1000, 3),
+        },
+        "query_ms": {
+            "p50": round(percentile(query_latencies, 50) * 1000, 3),
+            "p99": round(percentile(query_latencies, 99) * 1000, 3),
+        },
+        "rss_delta_bytes": rss_after - rss_before,
+        "index_memory_bytes": getattr(index, "memory_usage", None),
+    }
+    del index
+    return result
+
+
+def run_index(args) -> Dict[str, Any]:
+    try:
+        import numpy as np
+        from usearch.index import Index
+    except ImportError:
+        raise SystemExit("The index benchmark needs usearch and numpy: pip install usearch numpy")
+    from pathway_server import MIN_RESERVED_SPACE, reserved_space_for
+
+    scenarios = []
+    for size in (int(n) for n in args.sizes.split(",")):
+        policies = {"fixed": MIN_RESERVED_SPACE, "auto": reserved_space_for(size)}
+        for policy in args.policies.split(","):
+            scenarios.append(bench_index(size, policy, policies[policy], args, np, Index))
+    return {**run_metadata(args), "scenarios": scenarios}
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    e2e = sub.add_parser("e2e", help="course build and file server benchmark against local stand-ins")
+    e2e.add_argument("--sizes", default="1x3,3x5,6x10", help="comma separated MODULESxSLIDES course sizes")
+    e2e.add_argument("--iterations", type=int, default=3)
+    e2e.add_argument("--rag-latency", type=float, default=0.05, help="seconds per /v2/answer or /v1/statistics call")
+    e2e.add_argument("--llm-latency", type=float, default=0.02, help="seconds per generate_content call")
+    e2e.add_argument("--parse-latency", type=float, default=0.01, help="seconds per agentic_doc.parse call")
+    e2e.add_argument("--error-rate", type=float, default=0.0, help="probability that a stand-in call fails")
+    e2e.add_argument("--malformed-rate", type=float, default=0.0, help="probability that a generated slide needs repair")
+    e2e.add_argument("--module-workers", type=int, default=1,
+                     help="modules built at once; threads stand in for MODULE_WORKERS processes so the stand-ins apply")
+    e2e.add_argument("--payload-size", type=int, default=2000, help="approximate payload size in bytes")
+    e2e.add_argument("--seed", type=int, default=0)
+    e2e.add_argument("--output", help="write JSON results here instead of stdout")
+    e2e.set_defaults(func=run_e2e)
+
+    index = sub.add_parser("index", help="USearch KNN index scaling over synthetic embeddings")
+    index.add_argument("--sizes", default="10000,100000", help="comma separated chunk counts; see the README before going to 1000000")
+    index.add_argument("--policies", default="fixed,auto", help="reserved space policies to compare: fixed (reserved_space: 1000) and/or auto")
+    index.add_argument("--dim", type=int, default=3072, help="embedding dimensions (gemini-embedding-001 produces 3072)")
+    index.add_argument("--dtype", choices=sorted(DTYPE_BYTES), default="f32",
+                       help="scalar type the index stores vectors as; the retriever uses f32")
+    index.add_argument("--batch", type=int, default=1000, help="vectors added per ingest batch")
+    index.add_argument("--queries", type=int, default=200)
+    index.add_argument("--k", type=int, default=6, help="neighbours per query")
+    index.add_argument("--seed", type=int, default=0)
+    index.add_argument("--output", help="write JSON results here instead of stdout")
+    index.set_defaults(func=run_index)
+
+    args = parser.parse_args(argv)
+    results = args.func(args)
+    out = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(out, encoding="utf-8")
+    else:
+        print(out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+SQLite-backed job queue for course builds.
+
+Change detection enqueues build jobs and worker processes claim and run them.
+Jobs are keyed (by course id): enqueueing a key that already has a queued job
+coalesces into that job, a version that is already running or built is not
+enqueued again, and a running job for an older version is flagged so its
+worker can stop early.
+
+A claimed job is leased to its worker, which must heartbeat it. Jobs whose
+lease expired, because their worker died, are put back on the queue by the
+next claim; a worker that lost its lease can no longer finish the job.
+"""
+import json
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL,
+    version TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    lease_token TEXT,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, priority DESC, id);
+CREATE INDEX IF NOT EXISTS jobs_by_key ON jobs (key, status);
+"""
+
+LEASE_SECONDS = 60.0
+
+
+class Job:
+
+    def __init__(self, id: int, key: str, version: str, priority: int, payload: Dict[str, Any], token: str):
+        self.id = id
+        self.key = key
+        self.version = version
+        self.priority = priority
+        self.payload = payload
+        self.token = token
+
+
+class BuildQueue:
+
+    def __init__(self, path, lease: float = LEASE_SECONDS):
+        self.path = Path(path)
+        self.lease = lease
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def enqueue(self, key: str, version: str, payload: Dict[str, Any], priority: int = 0) -> int:
+        """Adds a build of `key` at `version`, returning the id of the job that will produce it."""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE key = ? AND status = ? AND version != ?",
+                (key, RUNNING, version),
+            )
+            queued = conn.execute("SELECT id FROM jobs WHERE key = ? AND status = ?", (key, QUEUED)).fetchone()
+            if queued:
+                conn.execute(
+                    "UPDATE jobs SET version = ?, payload = ?, priority = MAX(priority, ?) WHERE id = ?",
+                    (version, json.dumps(payload), priority, queued[0]),
+                )
+                return queued[0]
+            existing = conn.execute(
+                "SELECT id FROM jobs WHERE key = ? AND version = ? AND cancel_requested = 0 "
+                "AND (status = ? OR (status = ? AND heartbeat_at >= ?)) ORDER BY id DESC LIMIT 1",
+                (key, version, DONE, RUNNING, now - self.lease),
+            ).fetchone()
+            if existing:
+                return existing[0]
+            return conn.execute(
+                "INSERT INTO jobs (key, version, priority, payload, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, version, priority, json.dumps(payload), QUEUED, now),
+            ).lastrowid
+
+    def claim(self) -> Optional[Job]:
+        """Marks the highest priority queued job as running, leased to the caller, and returns it."""
+        now = time.time()
+        with self._transaction() as conn:
+            self._requeue(conn, "COALESCE(heartbeat_at, started_at, 0) < ?", (now - self.lease,))
+            row = conn.execute(
+                "SELECT id, key, version, priority, payload FROM jobs WHERE status = ? ORDER BY priority DESC, id LIMIT 1",
+                (QUEUED,),
+            ).fetchone()
+            if row is None:
+                return None
+            token = uuid.uuid4().hex
+            conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, heartbeat_at = ?, lease_token = ? WHERE id = ?",
+                (RUNNING, now, now, token, row[0]),
+            )
+        return Job(row[0], row[1], row[2], row[3], json.loads(row[4]), token)
+
+    def heartbeat(self, job: Job) -> bool:
+        """Extends the lease on `job`, returning False if the worker no longer holds it."""
+        with self._transaction() as conn:
+            return conn.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = ? AND lease_token = ?",
+                (time.time(), job.id, RUNNING, job.token),
+            ).rowcount == 1
+
+    def is_cancelled(self, job: Job) -> bool:
+        """True if `job` was superseded by a newer version or its lease was lost."""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT cancel_requested, status, lease_token FROM jobs WHERE id = ?", (job.id,)
+            ).fetchone()
+        finally:
+            conn.close()
+        return row is None or bool(row[0]) or row[1] != RUNNING or row[2] != job.token
+
+    def _finish(self, job: Job, status: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> bool:
+        with self._transaction() as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_token = NULL "
+                "WHERE id = ? AND status = ? AND lease_token = ?",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), job.id, RUNNING, job.token),
+            ).rowcount == 1
+
+    def complete(self, job: Job, result: Dict[str, Any]) -> bool:
+        return self._finish(job, DONE, result=result)
+
+    def fail(self, job: Job, error: str) -> bool:
+        return self._finish(job, FAILED, error=error)
+
+    def cancel(self, job: Job) -> bool:
+        return self._finish(job, CANCELLED)
+
+    def _requeue(self, conn: sqlite3.Connection, condition: str, params: tuple):
+        """
+        Puts running jobs matching `condition` back on the queue, or cancels
+        them if they were superseded or their key already has a queued job.
+        """
+        now = time.time()
+        rows = conn.execute(
+            f"SELECT id, key, cancel_requested FROM jobs WHERE status = ? AND ({condition}) ORDER BY id",
+            (RUNNING, *params),
+        ).fetchall()
+        for job_id, key, cancel_requested in rows:
+            queued = conn.execute("SELECT 1 FROM jobs WHERE key = ? AND status = ?", (key, QUEUED)).fetchone()
+            if cancel_requested or queued:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, finished_at = ?, lease_token = NULL WHERE id = ?",
+                    (CANCELLED, now, job_id),
+                )
+            else:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, started_at = NULL, heartbeat_at = NULL, lease_token = NULL WHERE id = ?",
+                    (QUEUED, job_id),
+                )
+
+    def requeue_running(self):
+        """Puts every running job back on the queue; for use when no worker is alive."""
+        with self._transaction() as conn:
+            self._requeue(conn, "1", ())
+
+    def latest_result(self, key: str) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT result FROM jobs WHERE key = ? AND status = ? ORDER BY id DESC LIMIT 1",
+                (key, DONE),
+            ).fetchone()
+        finally:
+            conn.close()
+        return json.loads(row[0]) if row else None
+
+    def counts(self) -> Dict[str, int]:
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        finally:
+            conn.close()
+        return dict(rows)
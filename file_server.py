@@ -40,12 +40,30 @@ import json
 COURSE_FILE = Path("data/input/course_structure.json").resolve()
 COURSE_FILE.parent.mkdir(parents=True, exist_ok=True)
 
+def _check_module_sources(data: dict):
+    # Modules may scope retrieval to folders under ROOT_DIR via "sources"
+    # and to metadata key/value pairs via "tags"
+    for m in data.get("modules", []) or []:
+        if not isinstance(m, dict): raise HTTPException(400, "Each module must be an object")
+        sources = m.get("sources", [])
+        if not isinstance(sources, list) or not all(isinstance(f, str) for f in sources):
+            raise HTTPException(400, "Module sources must be a list of folder paths")
+        for folder in sources:
+            if not _secure(folder).is_dir():
+                raise HTTPException(400, f"Source folder not found: {folder}")
+        tags = m.get("tags", {})
+        if not isinstance(tags, dict) or not all(isinstance(v, (str, int, float, bool)) for v in tags.values()):
+            raise HTTPException(400, "Module tags must be an object of metadata key/value pairs")
+
 # ---------- endpoints ----------
 @app.post("/api/course")
 def save_course_structure(data: dict = Body(...)):
     """
     Save course structure JSON (full overwrite).
+    Modules may declare "sources" (folders under the docs root) and "tags"
+    (metadata key/value pairs) to restrict which documents they retrieve from.
     """
+    _check_module_sources(data)
     try:
         with open(COURSE_FILE, "w", encoding="utf-8") as f:
             json.dump(data, f, indent=2)
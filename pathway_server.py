@@ -1,9 +1,17 @@
+import atexit
+import hashlib
 import json
+import math
+import multiprocessing
 import os
+import re
+import sqlite3
 import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
 from io import BytesIO
 from pathlib import Path
-from typing import List, Any
+from typing import List, Any, Callable, Optional
 
 import uvicorn
 from docutils.parsers.rst.directives.images import Figure
@@ -13,9 +21,14 @@ from google.genai.types import GenerateContentConfig
 from pydantic import BaseModel, ConfigDict, Field
 from landingai_ade.lib import pydantic_to_json_schema
 import pathway as pw
+from pathway.xpacks.llm.document_store import DocumentStore
+from pathway.xpacks.llm.splitters import TokenCountSplitter
 from agentic_doc.parse import parse
 from agentic_doc.config import ParseConfig
 
+from build_queue import BuildQueue, Job
+from semantic_cache import SemanticAnswerCache
+
 
 app = FastAPI()
 
@@ -95,6 +108,189 @@ class LandingAICustomDocumentParser(pw.UDF):
         return await self.parse(contents)
 
 
+CHUNK_STATS_FILE = Path("processed/chunk_stats.json")
+MIN_RESERVED_SPACE = 1000
+CHUNK_STATS_INTERVAL = 10.0  # seconds between rewrites of CHUNK_STATS_FILE while indexing
+
+
+def _write_json(path: Path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(data), encoding="utf-8")
+    tmp.replace(path)
+
+
+def reserved_space_for(chunk_count: int, minimum: int = MIN_RESERVED_SPACE, headroom: float = 2.0) -> int:
+    """KNN slots for `chunk_count` chunks: `headroom` times the count, rounded up to a power of two."""
+    target = max(minimum, math.ceil(chunk_count * headroom), 1)
+    return 1 << (target - 1).bit_length()
+
+
+def estimate_chunk_count(data_path: str, stats_path: Path = CHUNK_STATS_FILE, default_chunks_per_document: int = 20) -> int:
+    """
+    Estimates how many chunks the files under `data_path` will index, using
+    the per-document chunk counts recorded by the splitter on earlier runs and
+    their average for documents that have not been split yet.
+    """
+    files = [str(f.resolve()) for f in Path(data_path).rglob("*") if f.is_file()]
+    try:
+        observed = json.loads(Path(stats_path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        observed = {}
+    known = [observed[f] for f in files if f in observed]
+    per_document = sum(known) / len(known) if known else default_chunks_per_document
+    return math.ceil(sum(known) + per_document * (len(files) - len(known)))
+
+
+class AutoSizedUsearchKnnFactory(pw.stdlib.indexing.UsearchKnnFactory):
+    """
+    UsearchKnnFactory whose reserved space is sized from the observed document
+    and chunk counts under `data_path` instead of a fixed number, so large
+    corpora don't pay for repeated index reallocations while ingesting.
+
+    Sizing happens once, when the factory is built at startup: the index lives
+    in the Pathway engine and can't be reserved ahead from Python afterwards.
+    Documents uploaded while the server runs grow the index with USearch's
+    default growth until the next restart, and on the very first start, with
+    no recorded chunk counts, each document is assumed to yield 20 chunks.
+    """
+
+    def __init__(self, *, data_path: str = "data", min_reserved_space: int = MIN_RESERVED_SPACE, headroom: float = 2.0, chunk_stats_path: str = str(CHUNK_STATS_FILE), **kwargs):
+        chunks = estimate_chunk_count(data_path, Path(chunk_stats_path))
+        reserved_space = reserved_space_for(chunks, int(min_reserved_space), float(headroom))
+        print(f"Reserving {reserved_space} KNN slots for ~{chunks} chunks under {data_path}")
+        super().__init__(reserved_space=reserved_space, **kwargs)
+
+class ChunkDeduplicator:
+    """
+    Groups near-duplicate chunk texts under a shared id using SimHash.
+
+    Fingerprints are 64-bit and split into `max_distance + 1` bands, so any two
+    fingerprints within `max_distance` bits of each other share at least one
+    band and are found without scanning the whole index. The first fingerprint
+    seen for a group becomes its id.
+    """
+
+    def __init__(self, max_distance: int = 7, shingle_size: int = 3):
+        self.max_distance = max_distance
+        self.shingle_size = shingle_size
+        self.n_bands = max_distance + 1
+        self.band_bits = 64 // self.n_bands
+        self.bands: list[dict[int, list[int]]] = [{} for _ in range(self.n_bands)]
+
+    def fingerprint(self, text: str) -> Optional[int]:
+        words = re.sub(r"[^0-9a-z]+", " ", text.lower()).split()
+        if not words:
+            return None
+        n = min(self.shingle_size, len(words))
+        weights = [0] * 64
+        for i in range(len(words) - n + 1):
+            digest = hashlib.blake2b(" ".join(words[i:i + n]).encode(), digest_size=8).digest()
+            h = int.from_bytes(digest, "big")
+            for bit in range(64):
+                weights[bit] += 1 if h >> bit & 1 else -1
+        return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+    def _band_keys(self, fp: int):
+        mask = (1 << self.band_bits) - 1
+        return [fp >> (i * self.band_bits) & mask for i in range(self.n_bands)]
+
+    def find(self, fp: int) -> Optional[int]:
+        for band, key in zip(self.bands, self._band_keys(fp)):
+            for candidate in band.get(key, []):
+                if bin(candidate ^ fp).count("1") <= self.max_distance:
+                    return candidate
+        return None
+
+    def add(self, fp: int):
+        for band, key in zip(self.bands, self._band_keys(fp)):
+            band.setdefault(key, []).append(fp)
+
+    def group_id(self, text: str) -> Optional[str]:
+        """Id shared by `text` and its near-duplicates, or None if it has no words."""
+        fp = self.fingerprint(text)
+        if fp is None:
+            return None
+        canonical = self.find(fp)
+        if canonical is None:
+            self.add(fp)
+            canonical = fp
+        return f"{canonical:016x}"
+
+
+class DedupTokenCountSplitter(TokenCountSplitter):
+    """
+    TokenCountSplitter that tags every chunk with the `chunk_id` of its
+    near-duplicate group. It never drops chunks itself: DedupDocumentStore
+    collapses each group into one embedded chunk.
+    """
+
+    def __init__(self, *, max_distance: int = 7, stats_path: str = str(CHUNK_STATS_FILE),
+                 stats_interval: float = CHUNK_STATS_INTERVAL, **kwargs):
+        super().__init__(**kwargs)
+        self.dedup = ChunkDeduplicator(max_distance=max_distance)
+        self.stats_path = Path(stats_path)
+        self.stats_interval = stats_interval
+        self.chunk_counts: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stats_timer: Optional[threading.Timer] = None
+        atexit.register(self.write_stats)
+
+    def chunk(self, txt: str, metadata: dict = {}, **kwargs) -> list[tuple[str, dict]]:
+        source = str(metadata.get("path") or metadata.get("source") or "")
+        out = []
+        with self._lock:
+            for i, (text, chunk_metadata) in enumerate(super().chunk(txt, metadata, **kwargs)):
+                # Chunks without words get an id of their own and are never collapsed.
+                chunk_id = self.dedup.group_id(text) or hashlib.blake2b(f"{source}#{i}#{text}".encode(), digest_size=8).hexdigest()
+                out.append((text, {**chunk_metadata, "chunk_id": chunk_id}))
+            if source:
+                # Observed chunk counts feed the KNN index sizing on the next start.
+                self.chunk_counts[str(Path(source).resolve())] = len(out)
+                if self._stats_timer is None:
+                    self._stats_timer = threading.Timer(self.stats_interval, self.write_stats)
+                    self._stats_timer.daemon = True
+                    self._stats_timer.start()
+        return out
+
+    def write_stats(self):
+        """Writes the chunk counts recorded since the last write, at most once per `stats_interval`."""
+        with self._lock:
+            if self._stats_timer is None:
+                return
+            self._stats_timer.cancel()
+            self._stats_timer = None
+            _write_json(self.stats_path, self.chunk_counts)
+
+
+@pw.udf
+def _with_sources(metadata: pw.Json, sources: tuple) -> pw.Json:
+    return pw.Json({**metadata.as_dict(), "sources": sorted(set(sources))})
+
+
+class DedupDocumentStore(DocumentStore):
+    """
+    DocumentStore that embeds one chunk per near-duplicate group.
+
+    Chunks are grouped by the `chunk_id` DedupTokenCountSplitter assigns. Each
+    group is owned by the copy with the smallest source path, which is the
+    only one indexed, and `metadata.sources` lists the paths of every copy.
+    The grouping is incremental, so when the owner's document is edited or
+    deleted the next copy takes over and the sources list shrinks with it.
+    """
+
+    def split_docs(self, post_processed_docs: pw.Table) -> pw.Table:
+        chunks = super().split_docs(post_processed_docs)
+        keyed = chunks.with_columns(
+            chunk_key=pw.coalesce(pw.this.metadata["chunk_id"].as_str(), pw.apply_with_type(str, str, pw.this.id)),
+            source_path=pw.coalesce(pw.this.metadata["path"].as_str(), ""),
+        )
+        groups = keyed.groupby(pw.this.chunk_key).reduce(
+            owner=pw.reducers.argmin(pw.this.source_path),
+            sources=pw.reducers.tuple(pw.this.source_path),
+        )
+        owners = chunks.ix(groups.owner)
+        return owners.with_columns(metadata=_with_sources(owners.metadata, groups.sources))
 
 
 templates = '''
@@ -482,12 +678,50 @@ class SlideDesc:
     def __init__(self, desc):
         self.desc = desc
 
+# The file server's docs root, relative to the directory Pathway reads `data` from.
+DOCS_ROOT = os.environ.get("DOCS_ROOT", "data/docs").strip("/")
+
+def _jmespath_literal(value) -> str:
+    return "'" + str(value).replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def build_metadata_filter(sources: list[str], tags: dict) -> Optional[str]:
+    """
+    Builds the JMESPath `filters` expression for /v2/answer, so the document
+    store only searches chunks from the given folders with matching metadata.
+    Folders are relative to DOCS_ROOT, as in the file server. A chunk matches
+    a folder if any copy of it in `sources` (see DedupDocumentStore) is under
+    it, or, for chunks without sources, if its own path is.
+    """
+    if not isinstance(sources, list) or not all(isinstance(f, str) for f in sources):
+        raise ValueError(f"Module sources must be a list of folder paths, got {sources!r}")
+    if not isinstance(tags, dict):
+        raise ValueError(f"Module tags must be an object of metadata key/value pairs, got {tags!r}")
+    clauses = []
+    folders = [f.strip().strip("/") for f in sources if f.strip().strip("/")]
+    if folders:
+        patterns = [_jmespath_literal(f"**/{DOCS_ROOT}/{folder}/**") for folder in folders]
+        clauses.append("(" + " || ".join(
+            f"length((sources || `[]`)[?globmatch({pattern}, @)]) > `0` || globmatch({pattern}, path)"
+            for pattern in patterns
+        ) + ")")
+    for key, value in tags.items():
+        clauses.append(f"{json.dumps(str(key))} == {_jmespath_literal(value)}")
+    return " && ".join(clauses) or None
+
+
 class ModuleDesc:
 
-    def __init__(self, desc, slides: list[SlideDesc]):
+    def __init__(self, desc, slides: list[SlideDesc], sources: Optional[list[str]] = None, tags: Optional[dict] = None):
         self.desc = desc
         self.slides = slides
+        self.sources = [] if sources is None else sources  # folders under DOCS_ROOT to retrieve from
+        self.tags = {} if tags is None else tags  # metadata key/value pairs retrieved documents must match
         self.queries = "For the theme of questioning: " + desc + ". Answer the questions: " + self.get_desc() + ". You can make use of tables and explanations where required."
+        # Only the module-specific text is embedded for the answer cache; the
+        # fixed template around it would make unrelated modules look alike.
+        self.cache_text = "\n".join([desc] + [slide.desc for slide in slides])
+        self.filters = build_metadata_filter(self.sources, self.tags)
         self.information = None
 
     def get_desc(self):
@@ -528,21 +762,37 @@ def get_course_desc(d) -> CourseDesc:
             ModuleDesc(
                 desc=m["name"],
                 slides=[SlideDesc(**l) for l in m.get("slides", [])],
+                sources=m.get("sources", []),
+                tags=m.get("tags", {}),
             )
             for m in d.get("modules", [])
         ],
     )
 
 
-def get_course_information_query(course_desc: CourseDesc):
-    for i in range(len(course_desc.modules)):
-        module = course_desc.modules[i]
-        module.information = (module.desc, module.get_desc())
+import requests
+
+PATHWAY_URL = os.environ.get("PATHWAY_URL", "http://0.0.0.0:8000")
 
+EMBEDDING_MODEL = "gemini-embedding-001"
 
-import requests
 
-def run_info_query(query):
+def embed_query(query: str) -> list[float]:
+    result = client.models.embed_content(model=EMBEDDING_MODEL, contents=query)
+    return list(result.embeddings[0].values)
+
+
+def run_info_query(query, filters: Optional[str] = None, cache_text: Optional[str] = None):
+    try:
+        embedding = embed_query(cache_text or query)
+    except Exception as e:
+        print(f"Could not embed query, skipping answer cache: {e}")
+        embedding = None
+    if embedding is not None:
+        cached = answer_cache.get(embedding, last_indexed, filters)
+        if cached is not None:
+            return cached
+
     headers = {
         'accept': '*/*',
         'Content-Type': 'application/json',
@@ -553,30 +803,27 @@ def run_info_query(query):
         'return_context_docs': True,
         'response_type': 'long',
     }
-    return requests.post('http://0.0.0.0:8000/v2/answer', headers=headers, json=json_data).json()
-
-
-
-def query_course_info(course_desc: CourseDesc):
-    for module in course_desc.modules:
-        module.information = run_info_query(module.queries)
-
-
-def get_course_information(course_desc: CourseDesc):
-    get_course_information_query(course_desc)
-    return query_course_info(course_desc)
+    if filters:
+        json_data['filters'] = filters
+    response = requests.post(f'{PATHWAY_URL}/v2/answer', headers=headers, json=json_data)
+    # A failed answer must not reach the LLM as module information.
+    response.raise_for_status()
+    answer = response.json()
+    if embedding is not None:
+        answer_cache.put(embedding, last_indexed, filters, answer)
+    return answer
 
 from typing import List, Literal, Union, Annotated, Optional
 from pydantic import BaseModel, ConfigDict, Field
 
 from typing import List, Literal
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
 
 class TableData(BaseModel):
     model_config = ConfigDict(extra='forbid')
-    rows: List[str]
+    rows: List[str] = Field(default_factory=list)
     columns: List[str]
-    values: List[int]
+    values: List[List[str]]
 
 class TableFigure(BaseModel):
     model_config = ConfigDict(extra='forbid')
@@ -623,8 +870,10 @@ def clean_schema_for_gemini(schema: Any) -> Any:
 
 cleaned_schema = clean_schema_for_gemini(SlideResult.model_json_schema())
 
-def get_output_from_llm(slide: SlideDesc, info, _from, _to):
+def get_output_from_llm(slide: SlideDesc, info, _from, _to, error: Optional[str] = None):
     query = "Please answer the question: " + slide.desc + "From the information. " + str(info) + "If there is comparison required, compare "+str(_from) +" with "+ str(_to) + " . Don't use another other information, use only what I gave you. Make sure to output in the form of the template. The template information is as follows: " + templates
+    if error:
+        query += " Your previous output for this slide was rejected with the following validation error: " + error + " . Output the corrected slide only."
     return client.models.generate_content(
         model='',
         contents=query,
@@ -635,41 +884,355 @@ def get_output_from_llm(slide: SlideDesc, info, _from, _to):
     )
 
 
-def build_course(course_desc: CourseDesc, _from, _to) -> Course:
-    modules_out: List[Module] = []
+# ----- Local validation and repair of LLM slide output -----
+
+SLIDE_REPAIR_ATTEMPTS = 2  # re-asks for a single slide before giving up
+
+def _close_json(text: str) -> str:
+    """Closes any string, array and object left open by a truncated response."""
+    stack, in_string, escaped = [], False, False
+    for ch in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]" and stack:
+            stack.pop()
+    if in_string:
+        text = (text[:-1] if escaped else text) + '"'
+    text = text.rstrip()
+    if text.endswith(","):
+        text = text[:-1]
+    elif text.endswith(":"):
+        text += " null"
+    return text + "".join(reversed(stack))
+
+
+def load_json_lenient(text: Optional[str], allow_truncated: bool = False) -> Any:
+    """
+    Parses LLM JSON output, tolerating code fences and trailing text. Output
+    that was cut off is only repaired when `allow_truncated` is set, since the
+    repair drops whatever was lost with it.
+    """
+    if not text or "{" not in text:
+        raise ValueError("Response contains no JSON object")
+    text = text[text.index("{"):]
+    try:
+        return json.JSONDecoder().raw_decode(text)[0]
+    except ValueError:
+        pass
+    if not allow_truncated:
+        raise ValueError(f"Response is incomplete JSON, cut off after {len(text)} characters; output the whole slide")
+    # Truncated output: close what is open, dropping trailing partial elements until it parses.
+    candidate = text
+    while candidate:
+        try:
+            data = json.loads(_close_json(candidate))
+            print(f"Repaired truncated JSON, kept {len(candidate)} of {len(text)} characters")
+            return data
+        except ValueError:
+            cut = candidate.rfind(",")
+            if cut <= 0:
+                break
+            candidate = candidate[:cut]
+    raise ValueError("Response is not valid JSON and could not be repaired")
+
+
+def _as_list(value) -> list:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _as_text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+
+def repair_table(data: dict) -> dict:
+    columns = [_as_text(c) for c in _as_list(data.get("columns"))]
+    rows = [_as_text(r) for r in _as_list(data.get("rows"))]
+    values = _as_list(data.get("values"))
+
+    if values and not any(isinstance(v, (list, dict)) for v in values):
+        # Flat list of cells, e.g. one value per row name.
+        if rows and len(values) == len(rows) and len(columns) == 2:
+            values = [[r, v] for r, v in zip(rows, values)]
+        else:
+            width = max(len(columns), 1)
+            values = [values[i:i + width] for i in range(0, len(values), width)]
+
+    table = []
+    for row in values:
+        if isinstance(row, dict):
+            row = [row.get(c) for c in columns] if columns else list(row.values())
+        table.append([_as_text(cell) for cell in _as_list(row)])
+
+    if not columns and table:
+        columns, table = table[0], table[1:]
+    table = [(row + [""] * len(columns))[:len(columns)] for row in table]
+    if len(rows) != len(table):
+        rows = [row[0] if row else "" for row in table]
+    return {"rows": rows, "columns": columns, "values": table}
+
+
+def repair_slide_result(data: Any, slide_id: str = "") -> dict:
+    """
+    Coerces a decoded slide into the SlideResult shape: wraps flat slides,
+    drops unknown keys, converts scalars and numbers to strings and pads or
+    truncates table rows to the column count.
+    """
+    if isinstance(data, list) and len(data) == 1:
+        data = data[0]
+    if not isinstance(data, dict):
+        raise ValueError(f"Expected a JSON object for the slide, got {type(data).__name__}")
+    slide = data.get("slide") if isinstance(data.get("slide"), dict) else data
+
+    figures = []
+    for figure in _as_list(slide.get("figures")):
+        if not isinstance(figure, dict):
+            continue
+        table = figure.get("data") if isinstance(figure.get("data"), dict) else figure
+        figures.append({"type": "table", "data": repair_table(table)})
+
+    return {
+        "id": _as_text(data.get("id") or slide.get("id") or slide_id),
+        "slide": {
+            "text_list": [_as_text(t) for t in _as_list(slide.get("text_list"))],
+            "image_list": [_as_text(i) for i in _as_list(slide.get("image_list"))],
+            "figures": figures,
+        },
+    }
+
+
+def check_slide_content(slide: Slide):
+    """Rejects slides that are well-formed but empty, so they get re-asked instead of shipped."""
+    if not slide.text_list or not slide.text_list[0].strip():
+        raise ValueError("Slide has no heading: text_list[0] is required")
+    for figure in slide.figures:
+        if not figure.data.columns or not figure.data.values:
+            raise ValueError("Table figure has no columns or no values")
+
+
+def _is_rectangular(table: TableData) -> bool:
+    """True if every row has one cell per column and one row name per row."""
+    return len(table.rows) == len(table.values) and all(len(row) == len(table.columns) for row in table.values)
+
+
+def parse_slide_result(text: Optional[str], slide_id: str = "", allow_truncated: bool = False) -> SlideResult:
+    try:
+        result = SlideResult.model_validate_json(text or "")
+        strict = all(_is_rectangular(figure.data) for figure in result.slide.figures)
+    except ValidationError:
+        strict = False
+    if not strict:
+        result = SlideResult.model_validate(repair_slide_result(load_json_lenient(text, allow_truncated), slide_id))
+    check_slide_content(result.slide)
+    return result
+
+
+def generate_slide(slide_desc: SlideDesc, info, _from, _to, slide_id: str = "") -> Slide:
+    """
+    Generates one slide, re-asking for just this slide when its output can't be
+    repaired. Truncated output is only salvaged once the re-asks are used up.
+    """
+    error, responses = None, []
+    for attempt in range(SLIDE_REPAIR_ATTEMPTS + 1):
+        s = get_output_from_llm(slide_desc, info, _from, _to, error)
+        try:
+            return parse_slide_result(s.text, slide_id).slide
+        except ValueError as e:
+            error = str(e)
+            responses.append(s.text)
+            print(f"Slide {slide_id or slide_desc.desc!r} failed validation (attempt {attempt + 1}): {error}")
+    for text in reversed(responses):
+        try:
+            slide = parse_slide_result(text, slide_id, allow_truncated=True).slide
+        except ValueError:
+            continue
+        print(f"Slide {slide_id or slide_desc.desc!r} kept from a truncated response")
+        return slide
+    raise ValueError(f"Could not generate a valid slide {slide_id or slide_desc.desc!r}: {error}")
 
-    for mod in course_desc.modules:
-        slides_out: List[Slide] = []
-        for slide_desc in mod.slides:
-            s = get_output_from_llm(slide_desc, mod.information, _from, _to)
-            slide_obj = SlideResult.model_validate_json(s.text)
-            slides_out.append(slide_obj.slide)
-        modules_out.append(Module(slides=slides_out))
 
-    return Course(modules=modules_out)
+class BuildCancelled(Exception):
+    pass
 
 
-background_mapping = {1: ("India, USA")}
+def build_module(mod: ModuleDesc, i: int, _from, _to, index_version=None,
+                 should_cancel: Optional[Callable[[], bool]] = None) -> Module:
+    """Fetches the information for module `i` and generates its slides."""
+    global last_indexed
+    if index_version is not None:
+        # May run in a module worker process, which has its own globals.
+        last_indexed = index_version
+    mod.information = run_info_query(mod.queries, mod.filters, mod.cache_text)
+    slides_out: List[Slide] = []
+    for j, slide_desc in enumerate(mod.slides):
+        if should_cancel and should_cancel():
+            raise BuildCancelled(f"Build cancelled before slide-{i + 1}-{j + 1}")
+        slides_out.append(generate_slide(slide_desc, mod.information, _from, _to, f"slide-{i + 1}-{j + 1}"))
+    return Module(slides=slides_out)
+
+
+def build_course(course_desc: CourseDesc, _from, _to, should_cancel: Optional[Callable[[], bool]] = None,
+                 executor: Optional[Executor] = None) -> Course:
+    """
+    Builds the modules one after another, or all at once on `executor`. With
+    a process pool `should_cancel` is sent to the workers, so it must pickle.
+    """
+    if executor is None:
+        return Course(modules=[
+            build_module(mod, i, _from, _to, should_cancel=should_cancel) for i, mod in enumerate(course_desc.modules)
+        ])
+    futures = [
+        executor.submit(build_module, mod, i, _from, _to, last_indexed, should_cancel)
+        for i, mod in enumerate(course_desc.modules)
+    ]
+    try:
+        return Course(modules=[future.result() for future in futures])
+    finally:
+        # A failed or cancelled module stops the modules that haven't started.
+        for future in futures:
+            future.cancel()
+
+
+course: Course = None
+
+background_mapping = {1: ("India", "USA")}
 course_map = {1: course} #ID 1 maps India to US
 
 COURSE_FILE = Path("data/input/course_structure.json")
-def recreate_course():
+def recreate_course(course_id: int = 1, should_cancel: Optional[Callable[[], bool]] = None,
+                    executor: Optional[Executor] = None):
     course_desc = get_course_desc(json.loads(COURSE_FILE.read_text(encoding="utf-8")))
-    for id, from_to_mapping in background_mapping.items():
-        get_course_information(course_desc)
-        return build_course(course_desc, from_to_mapping[0], from_to_mapping[1])
+    _from, _to = background_mapping[course_id]
+    return build_course(course_desc, _from, _to, should_cancel, executor)
+
+
+# ----- Build queue and worker processes -----
 
+BUILD_QUEUE_FILE = Path("processed/build_queue.sqlite3")
+# A job builds a whole course and each course has at most one live job, so
+# more workers than courses would sit idle. Each job builds its modules in
+# parallel on MODULE_WORKERS processes of its own, sharing out the cores.
+BUILD_WORKERS = int(os.environ.get("BUILD_WORKERS", len(background_mapping)))
+MODULE_WORKERS = int(os.environ.get("MODULE_WORKERS", max(1, (os.cpu_count() or 1) // BUILD_WORKERS)))
+CHANGE_PRIORITY = 0  # builds triggered by new indexing
+MANUAL_PRIORITY = 10  # builds requested through the API
+
+build_queue = BuildQueue(BUILD_QUEUE_FILE)
+# Kept next to the queue so every build worker shares one answer cache.
+answer_cache = SemanticAnswerCache(BUILD_QUEUE_FILE)
+
+# Workers are spawned rather than forked so they can be restarted safely
+# while the web server and polling threads are running.
+_worker_context = multiprocessing.get_context("spawn")
+
+
+def run_build_job(queue: BuildQueue, job: Job) -> dict:
+    global last_indexed
+    # Workers are separate processes, take the index version from the job.
+    last_indexed = job.payload["index_version"]
+    answer_cache.invalidate(last_indexed)
+    should_cancel = partial(queue.is_cancelled, job)
+    if MODULE_WORKERS <= 1:
+        return recreate_course(int(job.key), should_cancel).model_dump()
+    with ProcessPoolExecutor(MODULE_WORKERS, mp_context=_worker_context) as executor:
+        return recreate_course(int(job.key), should_cancel, executor).model_dump()
+
+
+def _keep_leased(queue: BuildQueue, job: Job, stop: threading.Event):
+    while not stop.wait(queue.lease / 4):
+        try:
+            if not queue.heartbeat(job):
+                return
+        except sqlite3.OperationalError as e:
+            print(f"[worker {os.getpid()}] heartbeat for job {job.id} failed: {e}")
+
+
+def build_worker(queue_path: str, poll_interval: float = 1.0):
+    """Claims and runs build jobs until the process is stopped."""
+    queue = BuildQueue(queue_path)
+    while True:
+        try:
+            job = queue.claim()
+        except sqlite3.OperationalError as e:
+            print(f"[worker {os.getpid()}] could not claim a job: {e}")
+            time.sleep(poll_interval)
+            continue
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        print(f"[worker {os.getpid()}] building course {job.key} (job {job.id}, version {job.version})")
+        stop = threading.Event()
+        threading.Thread(target=_keep_leased, args=(queue, job, stop), daemon=True).start()
+        try:
+            try:
+                result = run_build_job(queue, job)
+            except BuildCancelled as e:
+                queue.cancel(job)
+                print(f"[worker {os.getpid()}] job {job.id} superseded: {e}")
+            except Exception as e:
+                queue.fail(job, str(e))
+                print(f"[worker {os.getpid()}] job {job.id} failed: {e}")
+            else:
+                if queue.complete(job, result):
+                    print(f"[worker {os.getpid()}] course {job.key} created")
+                else:
+                    print(f"[worker {os.getpid()}] job {job.id} lost its lease, result discarded")
+        except sqlite3.OperationalError as e:
+            # The lease expires and the job is retried by another claim.
+            print(f"[worker {os.getpid()}] could not record job {job.id}: {e}")
+        finally:
+            stop.set()
+
+
+def start_build_worker() -> multiprocessing.Process:
+    # Not a daemon: daemonic processes can't start the module worker pool.
+    worker = _worker_context.Process(target=build_worker, args=(str(BUILD_QUEUE_FILE),))
+    worker.start()
+    atexit.register(worker.terminate)
+    return worker
+
+
+def supervise_build_workers(n: int = BUILD_WORKERS, interval: float = 5.0):
+    """Runs `n` build workers, restarting any that exit."""
+    build_queue.requeue_running()
+    workers = [start_build_worker() for _ in range(n)]
+    while True:
+        time.sleep(interval)
+        for i, worker in enumerate(workers):
+            if not worker.is_alive():
+                print(f"Build worker {worker.pid} exited with code {worker.exitcode}, restarting")
+                workers[i] = start_build_worker()
+
+
+def enqueue_course_builds(index_version, priority: int = CHANGE_PRIORITY):
+    for course_id in background_mapping:
+        job_id = build_queue.enqueue(str(course_id), str(index_version), {"index_version": index_version}, priority)
+        print(f"Course {course_id} build queued (job {job_id})")
 
 
 def process_response(status_check_result: StatusCheckResult):
-    global course
     global last_modified
     global last_indexed
     if status_check_result.last_indexed!=last_modified and status_check_result.last_indexed!=last_indexed:
         last_indexed = status_check_result.last_indexed
         last_modified = status_check_result.last_modified
-        course = recreate_course().model_dump()
-        print("Course created")
+        enqueue_course_builds(last_indexed)
 
 
 
@@ -685,27 +1248,35 @@ def poll_endpoint(url: str, interval: int = 5):
             print(f"Error polling {url}: {e}")
         time.sleep(interval)
 
-course: Course = None
-
 
 @app.get("/course/get")
 def get_course():
-    return JSONResponse(content={"ids":course_map.keys()})
+    return JSONResponse(content={"ids":list(course_map.keys())})
 
 @app.get("/course/get/{course_id}")
 def get_course(course_id: int):
-    global course
-    course = course_map[course_id] if course_id in course_map else {}
-    return JSONResponse(content=course)
+    built = build_queue.latest_result(str(course_id))
+    if built is None:
+        built = course_map.get(course_id) or {}
+    return JSONResponse(content=built)
+
+@app.post("/course/build/{course_id}")
+def rebuild_course(course_id: int):
+    if course_id not in background_mapping:
+        return JSONResponse(status_code=404, content={"message": f"Unknown course {course_id}"})
+    # A manual rebuild supersedes any queued or running build of this course.
+    job_id = build_queue.enqueue(str(course_id), f"{last_indexed}:manual:{time.time()}", {"index_version": last_indexed}, MANUAL_PRIORITY)
+    return JSONResponse(content={"status": "queued", "job_id": job_id})
 
 @app.get("/course/status")
 def course_status():
-    return JSONResponse(content={"message": "Course is active", "status": "active"})
+    return JSONResponse(content={"message": "Course is active", "status": "active", "jobs": build_queue.counts()})
 
 def run_server():
     uvicorn.run(app, host="127.0.0.1", port=8001, log_level="info")
 
 
 if __name__ == "__main__":
+    threading.Thread(target=supervise_build_workers, daemon=True).start()
     threading.Thread(target=run_server, daemon=True).start()
-    print(poll_endpoint("http://localhost:8000/v1/statistics", interval=2))
\ No newline at end of file
+    print(poll_endpoint(f"{PATHWAY_URL}/v1/statistics", interval=2))
\ No newline at end of file
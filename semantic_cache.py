@@ -0,0 +1,123 @@
+"""
+SQLite-backed semantic cache for /v2/answer responses.
+
+Answers are stored with the embedding of the query that produced them, the
+index version they were answered against and their retrieval scope (the
+metadata filter). Every build worker opens the same file, so an answer
+fetched by one worker is reused by the others and survives restarts.
+"""
+import json
+import math
+import sqlite3
+import time
+from array import array
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+THRESHOLD = 0.95  # minimum cosine similarity to reuse a cached answer
+TTL = 24 * 60 * 60
+CAPACITY = 256
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    index_version TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    embedding BLOB NOT NULL,
+    norm REAL NOT NULL,
+    answer TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS answers_by_scope ON answers (index_version, scope);
+"""
+
+
+def _norm(embedding) -> float:
+    return math.sqrt(sum(x * x for x in embedding)) or 1.0
+
+
+class SemanticAnswerCache:
+    """
+    Caches /v2/answer responses by query embedding and index version.
+
+    A query whose embedding is within `threshold` cosine similarity of a cached
+    query for the same index version and retrieval scope gets the cached
+    answer and context docs back. Entries expire after `ttl` seconds and the
+    least recently used entry is evicted once `capacity` is reached.
+    `hits` and `misses` count lookups made by this process.
+    """
+
+    def __init__(self, path, threshold: float = THRESHOLD, ttl: float = TTL, capacity: int = CAPACITY):
+        self.path = Path(path)
+        self.threshold = threshold
+        self.ttl = ttl
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def get(self, embedding: list[float], index_version, scope: Optional[str] = None) -> Optional[dict]:
+        norm = _norm(embedding)
+        now = time.time()
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT id, embedding, norm FROM answers WHERE index_version = ? AND scope = ? AND created_at >= ?",
+                (str(index_version), scope or "", now - self.ttl),
+            ).fetchall()
+            best_id, best_sim = None, self.threshold
+            for entry_id, blob, entry_norm in rows:
+                cached = array("f")
+                cached.frombytes(blob)
+                if len(cached) != len(embedding):
+                    continue
+                sim = sum(a * b for a, b in zip(embedding, cached)) / (norm * entry_norm)
+                if sim >= best_sim:
+                    best_id, best_sim = entry_id, sim
+            if best_id is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE answers SET used_at = ? WHERE id = ?", (now, best_id))
+            answer = conn.execute("SELECT answer FROM answers WHERE id = ?", (best_id,)).fetchone()[0]
+        self.hits += 1
+        return json.loads(answer)
+
+    def put(self, embedding: list[float], index_version, scope: Optional[str], answer: dict):
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO answers (index_version, scope, embedding, norm, answer, created_at, used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (str(index_version), scope or "", array("f", embedding).tobytes(), _norm(embedding),
+                 json.dumps(answer), now, now),
+            )
+            conn.execute("DELETE FROM answers WHERE created_at < ?", (now - self.ttl,))
+            conn.execute(
+                "DELETE FROM answers WHERE id NOT IN (SELECT id FROM answers ORDER BY used_at DESC, id DESC LIMIT ?)",
+                (self.capacity,),
+            )
+
+    def invalidate(self, index_version):
+        """Drops every entry answered against an index version other than `index_version`."""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM answers WHERE index_version != ?", (str(index_version),))
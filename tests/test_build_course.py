@@ -0,0 +1,69 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+pytest.importorskip("pathway")
+ps = pytest.importorskip("pathway_server")
+
+
+def course_desc(modules=3, slides=2):
+    return ps.CourseDesc("Payments", [
+        ps.ModuleDesc(f"Module {i}", [ps.SlideDesc(f"Slide {i}.{j}") for j in range(slides)])
+        for i in range(modules)
+    ])
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = {"info": [], "slides": [], "threads": set()}
+
+    def run_info_query(query, filters=None, cache_text=None):
+        calls["info"].append(cache_text.splitlines()[0])
+        return {"response": cache_text}
+
+    def generate_slide(slide_desc, info, _from, _to, slide_id=""):
+        calls["slides"].append(slide_id)
+        calls["threads"].add(threading.get_ident())
+        return ps.Slide(text_list=[slide_id, slide_desc.desc], image_list=[])
+
+    monkeypatch.setattr(ps, "run_info_query", run_info_query)
+    monkeypatch.setattr(ps, "generate_slide", generate_slide)
+    return calls
+
+
+def headings(course):
+    return [[slide.text_list[0] for slide in module.slides] for module in course.modules]
+
+
+def test_builds_modules_in_order(calls):
+    course = ps.build_course(course_desc(), "India", "USA")
+
+    assert headings(course) == [[f"slide-{i}-{j}" for j in (1, 2)] for i in (1, 2, 3)]
+    assert calls["info"] == ["Module 0", "Module 1", "Module 2"]
+
+
+def test_fans_modules_out_to_the_executor(calls, monkeypatch):
+    barrier = threading.Barrier(3, timeout=5)
+    generate_slide = ps.generate_slide
+
+    def wait_for_all_modules(slide_desc, info, _from, _to, slide_id=""):
+        if slide_id.endswith("-1"):
+            barrier.wait()  # only passes if all three modules run at once
+        return generate_slide(slide_desc, info, _from, _to, slide_id)
+
+    monkeypatch.setattr(ps, "generate_slide", wait_for_all_modules)
+    with ThreadPoolExecutor(3) as executor:
+        course = ps.build_course(course_desc(), "India", "USA", executor=executor)
+
+    assert headings(course) == [[f"slide-{i}-{j}" for j in (1, 2)] for i in (1, 2, 3)]
+    assert len(calls["threads"]) == 3
+
+
+def test_cancelled_build_stops_every_module(calls):
+    with ThreadPoolExecutor(2) as executor, pytest.raises(ps.BuildCancelled):
+        ps.build_course(course_desc(), "India", "USA", should_cancel=lambda: True, executor=executor)
+
+    assert calls["slides"] == []
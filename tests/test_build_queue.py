@@ -0,0 +1,119 @@
+import pytest
+
+import build_queue
+from build_queue import BuildQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return BuildQueue(tmp_path / "queue.sqlite3", lease=60)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(build_queue.time, "time", lambda: now[0])
+    return now
+
+
+def test_enqueue_coalesces_into_queued_job(queue):
+    first = queue.enqueue("1", "v1", {"index_version": 1})
+    second = queue.enqueue("1", "v2", {"index_version": 2}, priority=5)
+
+    assert first == second
+    job = queue.claim()
+    assert (job.version, job.payload, job.priority) == ("v2", {"index_version": 2}, 5)
+    assert queue.claim() is None
+
+
+def test_enqueue_dedups_running_and_built_versions(queue):
+    job_id = queue.enqueue("1", "v1", {})
+    job = queue.claim()
+
+    assert queue.enqueue("1", "v1", {}) == job_id
+    queue.complete(job, {"modules": []})
+    assert queue.enqueue("1", "v1", {}) == job_id
+    assert queue.counts() == {"done": 1}
+    assert queue.latest_result("1") == {"modules": []}
+
+
+def test_claim_prefers_higher_priority(queue):
+    queue.enqueue("1", "v1", {})
+    queue.enqueue("2", "v1", {}, priority=10)
+
+    assert queue.claim().key == "2"
+    assert queue.claim().key == "1"
+
+
+def test_newer_version_cancels_running_job(queue):
+    queue.enqueue("1", "v1", {})
+    stale = queue.claim()
+    assert not queue.is_cancelled(stale)
+
+    newer = queue.enqueue("1", "v2", {})
+
+    assert newer != stale.id
+    assert queue.is_cancelled(stale)
+    assert queue.cancel(stale)
+    assert queue.claim().version == "v2"
+
+
+def test_expired_lease_is_reclaimed(queue, clock):
+    job_id = queue.enqueue("1", "v1", {})
+    dead = queue.claim()
+
+    clock[0] += 61
+    # The dead worker's job no longer dedups new requests for its version...
+    assert queue.enqueue("1", "v1", {}) != job_id
+    # ...and is cancelled in favour of the queued one on the next claim.
+    retry = queue.claim()
+    assert retry.version == "v1" and retry.id != dead.id
+    assert queue.counts() == {"cancelled": 1, "running": 1}
+
+
+def test_expired_lease_without_queued_job_is_requeued(queue, clock):
+    queue.enqueue("1", "v1", {})
+    dead = queue.claim()
+
+    clock[0] += 61
+    retry = queue.claim()
+
+    assert retry.id == dead.id and retry.token != dead.token
+    assert queue.is_cancelled(dead)
+    assert not queue.complete(dead, {"stale": True})
+    assert queue.complete(retry, {"fresh": True})
+    assert queue.latest_result("1") == {"fresh": True}
+
+
+def test_heartbeat_keeps_lease(queue, clock):
+    queue.enqueue("1", "v1", {})
+    job = queue.claim()
+
+    for _ in range(3):
+        clock[0] += 40
+        assert queue.heartbeat(job)
+    assert queue.claim() is None
+    assert queue.counts() == {"running": 1}
+
+
+def test_requeue_running_after_restart(queue):
+    queue.enqueue("1", "v1", {})
+    queue.enqueue("2", "v1", {})
+    orphan = queue.claim()
+    superseded = queue.claim()
+    queue.enqueue("2", "v2", {})
+
+    queue.requeue_running()
+
+    assert queue.claim().id == orphan.id
+    assert queue.claim().version == "v2"
+    assert not queue.complete(superseded, {})
+    assert queue.counts() == {"cancelled": 1, "running": 2}
+
+
+def test_failed_job_is_not_deduped(queue):
+    queue.enqueue("1", "v1", {})
+    job = queue.claim()
+    queue.fail(job, "boom")
+
+    assert queue.enqueue("1", "v1", {}) != job.id
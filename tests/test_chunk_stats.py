@@ -0,0 +1,41 @@
+import json
+import os
+
+import pytest
+
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+pytest.importorskip("pathway")
+ps = pytest.importorskip("pathway_server")
+
+
+@pytest.fixture
+def splitter(tmp_path, monkeypatch):
+    # Split on "|" instead of tokens, so no tokenizer has to be downloaded.
+    monkeypatch.setattr(
+        ps.TokenCountSplitter, "chunk",
+        lambda self, txt, metadata={}, **kwargs: [(text, dict(metadata)) for text in txt.split("|")],
+    )
+    splitter = ps.DedupTokenCountSplitter(stats_path=str(tmp_path / "chunk_stats.json"), stats_interval=60)
+    yield splitter
+    splitter.write_stats()
+
+
+def test_chunk_counts_are_written_in_batches(splitter, tmp_path):
+    splitter.chunk("alpha beta|gamma delta|epsilon", {"path": str(tmp_path / "a.pdf")})
+    splitter.chunk("zeta eta", {"path": str(tmp_path / "b.pdf")})
+
+    assert not splitter.stats_path.exists()
+    splitter.write_stats()
+    assert json.loads(splitter.stats_path.read_text()) == {
+        str(tmp_path / "a.pdf"): 3,
+        str(tmp_path / "b.pdf"): 1,
+    }
+
+
+def test_stats_are_not_rewritten_without_new_documents(splitter, tmp_path):
+    splitter.chunk("alpha beta", {"path": str(tmp_path / "a.pdf")})
+    splitter.write_stats()
+    splitter.stats_path.unlink()
+
+    splitter.write_stats()
+    assert not splitter.stats_path.exists()
@@ -0,0 +1,90 @@
+import os
+
+import pytest
+
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+pw = pytest.importorskip("pathway")
+ps = pytest.importorskip("pathway_server")
+from pathway.engine import ExternalIndexFactory, USearchMetricKind
+
+OWNER = "/app/data/docs/india/payments.pdf"
+COPY = "/app/data/docs/usa/payments.pdf"
+
+
+def matches(expression, metadata):
+    """Runs `expression` as a query filter over one indexed chunk, in the Pathway engine."""
+
+    class IndexSchema(pw.Schema):
+        data: list[float]
+        filter_data: pw.Json
+
+    class QuerySchema(pw.Schema):
+        data: list[float]
+        limit: int
+        filter_col: str
+
+    index = pw.debug.table_from_rows(IndexSchema, [([1.0, 0.0], pw.Json(metadata))])
+    queries = pw.debug.table_from_rows(QuerySchema, [([1.0, 0.0], 1, expression)])
+    factory = ExternalIndexFactory.usearch_knn_factory(
+        dimensions=2, reserved_space=10, metric=USearchMetricKind.COS,
+        connectivity=0, expansion_add=0, expansion_search=0,
+    )
+    replies = index._external_index_as_of_now(
+        queries,
+        index_column=index.data,
+        query_column=queries.data,
+        index_factory=factory,
+        query_responses_limit_column=queries.limit,
+        index_filter_data_column=index.filter_data,
+        query_filter_column=queries.filter_col,
+    ).select(matched=pw.apply_with_type(len, int, pw.this._pw_index_reply))
+    return pw.debug.table_to_pandas(replies)["matched"].tolist() == [1]
+
+
+def test_no_sources_or_tags_means_no_filter():
+    assert ps.build_metadata_filter([], {}) is None
+
+
+def test_matches_owner_path():
+    metadata = {"path": OWNER, "sources": [OWNER, COPY]}
+
+    assert matches(ps.build_metadata_filter(["india"], {}), metadata)
+
+
+def test_matches_chunk_whose_duplicate_is_in_the_folder():
+    metadata = {"path": OWNER, "sources": [OWNER, COPY]}
+
+    assert matches(ps.build_metadata_filter(["usa"], {}), metadata)
+    assert not matches(ps.build_metadata_filter(["uk"], {}), metadata)
+
+
+def test_falls_back_to_path_without_sources():
+    filters = ps.build_metadata_filter(["usa/"], {})
+
+    assert matches(filters, {"path": COPY})
+    assert not matches(filters, {"path": OWNER})
+
+
+def test_folder_is_anchored_to_the_docs_root():
+    filters = ps.build_metadata_filter(["usa"], {})
+
+    assert not matches(filters, {"path": "/app/data/docs/archive/usa/payments.pdf", "sources": []})
+
+
+def test_tags_must_all_match():
+    filters = ps.build_metadata_filter(["usa"], {"lang": "en", "year": 2024})
+
+    assert matches(filters, {"path": OWNER, "sources": [OWNER, COPY], "lang": "en", "year": "2024"})
+    assert not matches(filters, {"path": OWNER, "sources": [OWNER, COPY], "lang": "fr", "year": "2024"})
+
+
+def test_quotes_in_folders_are_escaped():
+    path = "/app/data/docs/o'brien/notes.pdf"
+
+    assert matches(ps.build_metadata_filter(["o'brien"], {}), {"path": path, "sources": [path]})
+
+
+@pytest.mark.parametrize("sources, tags", [("usa", {}), ([1], {}), ([], ["lang"])])
+def test_rejects_malformed_sources_and_tags(sources, tags):
+    with pytest.raises(ValueError):
+        ps.build_metadata_filter(sources, tags)
@@ -0,0 +1,69 @@
+import pytest
+
+import semantic_cache
+from semantic_cache import SemanticAnswerCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SemanticAnswerCache(tmp_path / "cache.sqlite3", capacity=2)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(semantic_cache.time, "time", lambda: now[0])
+    return now
+
+
+def test_similar_query_hits(cache):
+    cache.put([1.0, 0.0, 0.1], 1, None, {"response": "cached"})
+
+    assert cache.get([1.0, 0.0, 0.12], 1) == {"response": "cached"}
+    assert cache.get([0.0, 1.0, 0.0], 1) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_shared_between_instances(cache, tmp_path):
+    cache.put([1.0, 0.0], 1, "scope", {"response": "cached"})
+
+    other = SemanticAnswerCache(tmp_path / "cache.sqlite3")
+    assert other.get([1.0, 0.0], 1, "scope") == {"response": "cached"}
+
+
+def test_index_version_and_scope_must_match(cache):
+    cache.put([1.0, 0.0], 1, "a", {"response": "cached"})
+
+    assert cache.get([1.0, 0.0], 2, "a") is None
+    assert cache.get([1.0, 0.0], 1, "b") is None
+    assert cache.get([1.0, 0.0], 1) is None
+
+
+def test_invalidate_drops_other_versions(cache):
+    cache.put([1.0, 0.0], 1, None, {"response": "old"})
+    cache.put([0.0, 1.0], 2, None, {"response": "new"})
+
+    cache.invalidate(2)
+    assert cache.get([1.0, 0.0], 1) is None
+    assert cache.get([0.0, 1.0], 2) == {"response": "new"}
+
+
+def test_entries_expire(cache, clock):
+    cache.put([1.0, 0.0], 1, None, {"response": "cached"})
+
+    clock[0] += cache.ttl + 1
+    assert cache.get([1.0, 0.0], 1) is None
+
+
+def test_evicts_least_recently_used(cache, clock):
+    cache.put([1.0, 0.0, 0.0], 1, None, {"response": "a"})
+    clock[0] += 1
+    cache.put([0.0, 1.0, 0.0], 1, None, {"response": "b"})
+    clock[0] += 1
+    cache.get([1.0, 0.0, 0.0], 1)
+    clock[0] += 1
+    cache.put([0.0, 0.0, 1.0], 1, None, {"response": "c"})
+
+    assert cache.get([0.0, 1.0, 0.0], 1) is None
+    assert cache.get([1.0, 0.0, 0.0], 1) == {"response": "a"}
+    assert cache.get([0.0, 0.0, 1.0], 1) == {"response": "c"}
@@ -0,0 +1,143 @@
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+pytest.importorskip("pathway")
+ps = pytest.importorskip("pathway_server")
+
+
+def make_slide(values=None, rows=None):
+    rows = ["Card", "Wire"] if rows is None else rows
+    return {
+        "id": "slide-1-1",
+        "slide": {
+            "text_list": ["Payments", "How money moves"],
+            "image_list": [],
+            "figures": [{
+                "type": "table",
+                "data": {
+                    "rows": rows,
+                    "columns": ["Method", "Fee"],
+                    "values": values if values is not None else [[r, "1%"] for r in rows],
+                },
+            }],
+        },
+    }
+
+
+def table(result):
+    return result.slide.figures[0].data
+
+
+def test_valid_slide_passes_unchanged():
+    slide = make_slide()
+
+    assert ps.parse_slide_result(json.dumps(slide)).model_dump() == slide
+
+
+def test_flat_slide_with_integer_cells_is_wrapped():
+    slide = make_slide()
+    flat = {"id": slide["id"], **slide["slide"]}
+    flat["figures"][0]["data"]["values"] = [1, 2]
+
+    result = ps.parse_slide_result(json.dumps(flat))
+
+    assert result.id == "slide-1-1"
+    assert result.slide.text_list == ["Payments", "How money moves"]
+    assert table(result).values == [["Card", "1"], ["Wire", "2"]]
+
+
+def test_ragged_rows_are_fitted_to_the_columns():
+    slide = make_slide(values=[["Card", "1%", "extra"], ["Wire"]])
+
+    data = table(ps.parse_slide_result(json.dumps(slide)))
+
+    assert data.values == [["Card", "1%"], ["Wire", ""]]
+    assert data.rows == ["Card", "Wire"]
+
+
+def test_missing_row_names_are_derived():
+    slide = make_slide()
+    del slide["slide"]["figures"][0]["data"]["rows"]
+
+    assert table(ps.parse_slide_result(json.dumps(slide))).rows == ["Card", "Wire"]
+
+
+def test_extra_keys_are_dropped():
+    slide = make_slide()
+    slide["type"] = 3
+    slide["slide"]["layout"] = "two-column"
+    slide["slide"]["figures"][0]["caption"] = "Fees"
+
+    result = ps.parse_slide_result(json.dumps(slide), "slide-1-1")
+
+    assert result.model_dump() == make_slide()
+
+
+def test_code_fences_and_trailing_text_are_ignored():
+    text = "```json\n" + json.dumps(make_slide()) + "\n```\nHope this helps."
+
+    assert ps.parse_slide_result(text).model_dump() == make_slide()
+
+
+def test_truncated_output_is_rejected():
+    text = json.dumps(make_slide())
+
+    with pytest.raises(ValueError, match="incomplete"):
+        ps.parse_slide_result(text[:int(len(text) * 0.9)])
+
+
+def test_truncated_output_is_repaired_when_allowed():
+    text = json.dumps(make_slide())
+
+    result = ps.parse_slide_result(text[:int(len(text) * 0.9)], allow_truncated=True)
+
+    assert result.slide.text_list[0] == "Payments"
+
+
+def test_slide_without_heading_is_rejected():
+    slide = make_slide()
+    slide["slide"]["text_list"] = []
+
+    with pytest.raises(ValueError, match="heading"):
+        ps.parse_slide_result(json.dumps(slide))
+
+
+def fake_llm(monkeypatch, responses):
+    errors = []
+
+    def get_output_from_llm(slide, info, _from, _to, error=None):
+        errors.append(error)
+        return SimpleNamespace(text=responses[len(errors) - 1])
+
+    monkeypatch.setattr(ps, "get_output_from_llm", get_output_from_llm)
+    return errors
+
+
+def test_truncated_slide_is_re_asked(monkeypatch):
+    text = json.dumps(make_slide())
+    errors = fake_llm(monkeypatch, [text[:len(text) // 2], text])
+
+    slide = ps.generate_slide(ps.SlideDesc("Explain fees"), {}, "India", "USA", "slide-1-1")
+
+    assert slide.model_dump() == make_slide()["slide"]
+    assert errors[0] is None and "incomplete" in errors[1]
+
+
+def test_truncated_slide_is_kept_after_re_asks_run_out(monkeypatch):
+    text = json.dumps(make_slide())
+    fake_llm(monkeypatch, ["not json"] * ps.SLIDE_REPAIR_ATTEMPTS + [text[:int(len(text) * 0.9)]])
+
+    slide = ps.generate_slide(ps.SlideDesc("Explain fees"), {}, "India", "USA", "slide-1-1")
+
+    assert slide.text_list[0] == "Payments"
+
+
+def test_generate_slide_gives_up_on_unrepairable_output(monkeypatch):
+    fake_llm(monkeypatch, ["not json"] * (ps.SLIDE_REPAIR_ATTEMPTS + 1))
+
+    with pytest.raises(ValueError, match="Could not generate"):
+        ps.generate_slide(ps.SlideDesc("Explain fees"), {}, "India", "USA", "slide-1-1")